@@ -0,0 +1,102 @@
+'''
+Startup-time benchmark for apilinks preprocessor.
+
+Measures, for each site backend, the time to import the preprocessor and the
+time to create it (__init__), and shows which heavy modules were imported.
+Each measurement is made in a fresh interpreter. API pages and specs are
+local files, so no network is needed.
+
+Usage:
+
+    python benchmarks/startup.py [--runs N]
+'''
+
+import json
+import subprocess
+import sys
+import tempfile
+
+from argparse import ArgumentParser
+from pathlib import Path
+
+HEAVY_MODULES = ('lxml.etree', 'yaml', 'ssl', 'urllib.request')
+
+HTML_PAGE = ''.join(f'<h2 id="get-method-{i}">GET /method/{i}</h2>' for i in range(1000))
+
+SPEC = json.dumps({
+    'paths': {
+        f'/method/{i}': {'get': {'tags': ['tag'], 'operationId': f'method{i}'}}
+        for i in range(1000)
+    }
+})
+
+CASES = {
+    'slate (offline)': lambda d: ({'url': (d / 'api.html').as_uri()}, True),
+    'slate': lambda d: ({'url': (d / 'api.html').as_uri()}, False),
+    'aglio': lambda d: ({'url': (d / 'api.html').as_uri(), 'site_backend': 'aglio'}, False),
+    'swagger': lambda d: ({'url': 'http://example.com',
+                           'spec': str(d / 'spec.json'),
+                           'site_backend': 'swagger'}, False),
+    'redoc': lambda d: ({'url': 'http://example.com',
+                         'spec': str(d / 'spec.json'),
+                         'site_backend': 'redoc'}, False),
+}
+
+SCRIPT = '''
+import json, logging, sys, time
+from pathlib import Path
+
+start = time.perf_counter()
+from foliant.preprocessors.apilinks import Preprocessor
+imported = time.perf_counter()
+
+api, offline = json.loads(sys.argv[1])
+project = Path(sys.argv[2])
+Preprocessor(
+    {{'project_path': project, 'config': {{'tmp_dir': '__tmp'}}, 'target': 'site'}},
+    logging.getLogger('benchmark'),
+    quiet=True,
+    options={{'API': {{'Bench': api}}, 'offline': offline}}
+)
+inited = time.perf_counter()
+
+print(json.dumps({{
+    'import': imported - start,
+    'init': inited - imported,
+    'modules': [m for m in {heavy!r} if m in sys.modules]
+}}))
+'''.format(heavy=HEAVY_MODULES)
+
+
+def measure(api: dict, offline: bool, project: Path) -> dict:
+    result = subprocess.run(
+        [sys.executable, '-c', SCRIPT, json.dumps([api, offline]), str(project)],
+        check=True,
+        stdout=subprocess.PIPE
+    )
+    return json.loads(result.stdout)
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='Runs per backend, best is shown')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        project = Path(tmp)
+        (project / '__tmp').mkdir()
+        (project / 'api.html').write_text(HTML_PAGE, encoding='utf8')
+        (project / 'spec.json').write_text(SPEC, encoding='utf8')
+
+        print(f'{"backend":<18}{"import, ms":>12}{"__init__, ms":>14}  heavy modules')
+        for name, case in CASES.items():
+            api, offline = case(project)
+            runs = [measure(api, offline, project) for _ in range(args.runs)]
+            best_import = min(r['import'] for r in runs) * 1000
+            best_init = min(r['init'] for r in runs) * 1000
+            modules = ', '.join(runs[0]['modules']) or '-'
+            print(f'{name:<18}{best_import:>12.1f}{best_init:>14.1f}  {modules}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,6 @@
 '''apilinks preprocessor for Foliant. Replaces API references with links to API
 docs'''
+import json
 import re
 
 from collections import OrderedDict
@@ -14,12 +15,15 @@ from .constants import DEFAULT_IGNORING_PREFIX
 from .constants import DEFAULT_REF_REGEX
 from .constants import REQUIRED_REF_REGEX_GROUPS
 
+from .backends import get_api_class
+from .backends import get_site_backend
 from .classes import API
 from .classes import GenURLError
-from .classes import RedocAPI
 from .classes import Reference
-from .classes import SwaggerAPI
+from .classes import Resolution
 from .classes import WrongModeError
+from .tools import ensure_root
+from .tools import get_shard
 from foliant.contrib.combined_options import CombinedOptions
 from foliant.contrib.combined_options import Options
 
@@ -36,7 +40,13 @@ class Preprocessor(BasePreprocessor):
         'trim_if_targets': [],
         'trim_template': '`{verb} {command}`',  # ref
         'API': {},
-        'offline': False}
+        'offline': False,
+        'shard_index': 0,
+        'shard_count': 1,
+        'export_index': '',
+        'import_index': '',
+        'shard_summary': '',
+        'max_warning_occurrences': 10}
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -51,24 +61,77 @@ class Preprocessor(BasePreprocessor):
         self.logger.debug(f'Preprocessor inited: {self.__dict__}')
         self.current_filename = ''
 
+        self.shard_index = int(self.options['shard_index'])
+        self.shard_count = int(self.options['shard_count'])
+        if self.shard_count < 1 or not 0 <= self.shard_index < self.shard_count:
+            raise RuntimeError(f'Wrong shard: {self.shard_index} of {self.shard_count}. '
+                               'shard_index should be between 0 and shard_count - 1')
+        self.warnings = OrderedDict()
+
         self.offline = bool(self.options['offline'])
         self.apis = OrderedDict()
         self.default_api = None
-        self.set_apis()
+        if self.options['import_index']:
+            self.import_index(self._get_path(self.options['import_index']))
+        else:
+            self.set_apis()
+        if self.options['export_index']:
+            self.export_index(self._get_path(self.options['export_index']))
 
         self.counter = 0
 
     def _warning(self, msg: str):
-        '''Log warning and print to user'''
+        '''
+        Remember warning. All warnings are grouped by message and shown to
+        user by _flush_warnings at the end of the preprocessor work.
+        '''
 
-        output(f'WARNING: [{self.current_filename}] {msg}', self.quiet)
-        self.logger.warning(msg)
+        key = (msg, str(self.current_filename))
+        self.warnings[key] = self.warnings.get(key, 0) + 1
+
+    def _flush_warnings(self):
+        '''
+        Log and print to user all remembered warnings, grouped by message, with
+        the number of occurrences. Only max_warning_occurrences files are
+        listed for each message, the full list is logged at debug level.
+        Remembered warnings are cleared afterwards.
+        '''
+
+        grouped = OrderedDict()
+        for (msg, filename), count in self.warnings.items():
+            grouped.setdefault(msg, []).append((filename, count))
+
+        limit = int(self.options['max_warning_occurrences'])
+        for msg, occurrences in grouped.items():
+            total = sum(count for _, count in occurrences)
+            files = [f'[{filename}] x{count}' for filename, count in occurrences if filename]
+            lines = [msg]
+            if total > 1:
+                lines[0] += f' ({total} occurrences)'
+            lines.extend(f'    {line}' for line in files[:limit])
+            if len(files) > limit:
+                lines.append(f'    ...and {len(files) - limit} more files')
+            output('WARNING: ' + '\n'.join(lines), self.quiet)
+            self.logger.warning('\n'.join(lines))
+            if len(files) > limit:
+                self.logger.debug('\n'.join([lines[0], *files]))
+        self.warnings.clear()
+
+    def _get_path(self, path: str) -> Path:
+        '''Return path from config, relative paths are resolved from the project dir'''
+        return Path(self.project_path) / path
+
+    def _in_shard(self, rel_path: Path) -> bool:
+        '''Return True if the file with relative path rel_path is processed by this shard'''
+        return get_shard(rel_path, self.shard_count) == self.shard_index
 
     def _apply_for_all_files(self, func, log_msg: str):
         '''Apply function func to all Mardown-files in the working dir'''
         self.logger.info(log_msg)
         for markdown_file_path in self.working_dir.rglob('*.md'):
             self.current_filename = Path(markdown_file_path).relative_to(self.working_dir)
+            if not self._in_shard(self.current_filename):
+                continue
             with open(markdown_file_path,
                       encoding='utf8') as markdown_file:
                 content = markdown_file.read()
@@ -100,62 +163,22 @@ class Preprocessor(BasePreprocessor):
         '''
 
         for api in self.options.get('API', {}):
+            api_dict = self.options['API'][api]
+            site_backend = self._get_api_site_backend(api_dict)
+            if get_site_backend(site_backend).spec_required and not api_dict.get('spec'):
+                self._warning(
+                    f'API {api} has "{site_backend}" site backend but no "spec"'
+                    ' stated. Skipping')
+                continue
+            try:
+                api_class = get_api_class(site_backend, self.offline)
+            except WrongModeError as e:
+                self._warning(f'{e}. Skipping {api}')
+                continue
             try:
-                api_dict = self.options['API'][api]
-                if api_dict.get('site_backend') == 'swagger' or \
-                        api_dict.get('site_backend') is None and api_dict.get('spec'):
-                    # by default is spec stated we assume it's a Swagger UI
-                    if not api_dict.get('spec'):
-                        self._warning(
-                            f'API {api} has "swagger" site backend but no "spec"'
-                            ' stated. Skipping')
-                        continue
-                    try:
-                        api_obj = SwaggerAPI(
-                            api,
-                            api_dict['url'],
-                            api_dict['spec'],
-                            self.offline,
-                            api_dict.get('endpoint_prefix', ''),
-                            api_dict.get('login'),
-                            api_dict.get('password'),
-                        )
-                    except WrongModeError:
-                        self._warning(
-                            f'Swagger UI APIs only work in online mode. Skipping {api}')
-                        continue
-                elif api_dict.get('site_backend') == 'redoc':
-                    if not api_dict.get('spec'):
-                        self._warning(
-                            f'API {api} has "redoc" site backend but no "spec"'
-                            ' stated. Skipping')
-                        continue
-                    try:
-                        api_obj = RedocAPI(
-                            api,
-                            api_dict['url'],
-                            api_dict['spec'],
-                            self.offline,
-                            api_dict.get('endpoint_prefix', ''),
-                            api_dict.get('login'),
-                            api_dict.get('password'),
-                        )
-                    except WrongModeError:
-                        self._warning(
-                            f'Redoc APIs only work in online mode. Skipping {api}')
-                        continue
-                else:  # not a swagger site_backend
-                    api_obj = API(
-                        api,
-                        api_dict['url'],
-                        api_dict.get('header_template',
-                                     DEFAULT_HEADER_TEMPLATE),
-                        self.offline,
-                        api_dict.get('site_backend', 'slate'),
-                        api_dict.get('endpoint_prefix', ''),
-                        api_dict.get('login'),
-                        api_dict.get('password'),
-                    )
+                api_obj = api_class.from_config(api,
+                                                {**api_dict, 'site_backend': site_backend},
+                                                self.offline)
                 self.apis[api.lower()] = api_obj
                 if api_dict.get('default', False) and self.default_api is None:
                     self.default_api = api_obj
@@ -163,11 +186,119 @@ class Preprocessor(BasePreprocessor):
                 self._warning(f'Could not open url {api_dict["url"]} for API {api}: {e}. '
                               'Skipping.')
         if not self.apis:
+            self._flush_warnings()
             raise RuntimeError('No APIs are set up')
         if self.default_api is None:
             first_api_name = list(self.apis.keys())[0]
             self.default_api = self.apis[first_api_name]
 
+    def _get_api_site_backend(self, api_dict: dict) -> str:
+        '''Return site backend name for API properties from the config'''
+        site_backend = api_dict.get('site_backend')
+        if site_backend is None:
+            # by default if spec stated we assume it's a Swagger UI
+            site_backend = 'swagger' if api_dict.get('spec') else 'slate'
+        return site_backend
+
+    def export_index(self, path: Path):
+        '''
+        Save all set up APIs with their collected headers into a JSON file, so
+        that other shards could import them with import_index instead of
+        fetching API web-pages again.
+
+        path (Path) — path to the index file.
+        '''
+
+        self.logger.info(f'Exporting API index to {path}')
+        index = {'apis': [api.to_dict() for api in self.apis.values()]}
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf8') as index_file:
+            json.dump(index, index_file, ensure_ascii=False)
+
+    def import_index(self, path: Path):
+        '''
+        Fills self.apis dictionary and sets self.default_api like set_apis,
+        but takes collected headers from the JSON file, produced by
+        export_index, instead of fetching API web-pages. All other API
+        properties are taken from the config.
+
+        Throws RuntimeError if the index doesn't match the config.
+
+        path (Path) — path to the index file.
+        '''
+
+        self.logger.info(f'Importing API index from {path}')
+        config_apis = self.options.get('API', {})
+        try:
+            with open(path, encoding='utf8') as index_file:
+                index = json.load(index_file)
+            index_apis = {api_dict['name'].lower(): api_dict for api_dict in index['apis']}
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self.logger.error(f'Could not read API index {path}: {e}')
+            raise RuntimeError(f'Could not read API index {path}: {e}')
+
+        unknown = set(index_apis) - {api.lower() for api in config_apis}
+        if unknown:
+            self.logger.error(f'API index {path} does not match the config')
+            raise RuntimeError(f'API index {path} does not match the config, APIs '
+                               f'{", ".join(sorted(unknown))} are not in the config')
+
+        for api, api_dict in config_apis.items():
+            site_backend = self._get_api_site_backend(api_dict)
+            index_dict = index_apis.get(api.lower())
+            if index_dict is None:
+                self._warning(f'API {api} is not in the API index {path}. Skipping')
+                continue
+            try:
+                mismatch = []
+                if bool(index_dict['offline']) != self.offline:
+                    mismatch.append('offline')
+                if index_dict['site_backend'] != site_backend:
+                    mismatch.append('site_backend')
+                if mismatch:
+                    self.logger.error(f'API index {path} does not match the config for API {api}')
+                    raise RuntimeError(f'API index {path} does not match the config for API {api}: '
+                                       f'{", ".join(mismatch)} differs. Export it again')
+                endpoint_prefix = api_dict.get('endpoint_prefix', '')
+                index_dict = {**index_dict,
+                              'name': api,
+                              'url': api_dict['url'],
+                              'endpoint_prefix': ensure_root(endpoint_prefix) if endpoint_prefix else ''}
+                if not get_site_backend(site_backend).spec_required:
+                    index_dict['header_template'] = api_dict.get('header_template',
+                                                                 DEFAULT_HEADER_TEMPLATE)
+                api_obj = get_api_class(site_backend, self.offline).from_dict(index_dict)
+            except KeyError as e:
+                self.logger.error(f'Could not read API index {path}: {e}')
+                raise RuntimeError(f'Could not read API index {path}: {e}')
+            self.apis[api.lower()] = api_obj
+            if api_dict.get('default', False) and self.default_api is None:
+                self.default_api = api_obj
+        if not self.apis:
+            self._flush_warnings()
+            raise RuntimeError('No APIs are set up')
+        if self.default_api is None:
+            first_api_name = list(self.apis.keys())[0]
+            self.default_api = self.apis[first_api_name]
+
+    def write_summary(self, path: Path):
+        '''
+        Save the number of added links and all warnings of this shard into a
+        JSON file. Summaries of all shards may be merged with
+        tools.merge_summaries.
+
+        path (Path) — path to the summary file.
+        '''
+
+        summary = {'shard_index': self.shard_index,
+                   'shard_count': self.shard_count,
+                   'counter': self.counter,
+                   'warnings': [{'message': msg, 'file': filename, 'count': count}
+                                for (msg, filename), count in self.warnings.items()]}
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf8') as summary_file:
+            json.dump(summary, summary_file, ensure_ascii=False, indent=4)
+
     def _compile_link_pattern(self, expr: str) -> bool:
         '''
         Checks whether the expression expr is valid and has all required
@@ -226,20 +357,41 @@ class Preprocessor(BasePreprocessor):
         ref (Reference) — Reference object for which the API should be found.
         '''
 
-        if self.is_prefix_defined(ref.prefix):
-            api = self.apis[ref.prefix.lower()]
-            if api.find_reference(ref):
-                return api
-            else:
-                raise GenURLError(f'Cannot find method {ref.verb} {ref.command} in {api.name}.')
+        self.check_prefix(ref.prefix)
+        api = self.apis[ref.prefix.lower()]
+        self.check_reference(api, ref)
+        return api
+
+    def check_reference(self, api: API, ref: Reference):
+        '''
+        Trows GenURLError if the method represented by reference is not found
+        in the headers of api.
+
+        api (API) — API object to look in;
+        ref (Reference) — Reference object to look for.
+        '''
+
+        if not api.find_reference(ref):
+            raise GenURLError(f'Cannot find method {ref.verb} {ref.command} in {api.name}.')
+
+    def check_prefix(self, prefix: str):
+        '''
+        Trows GenURLError if there's no set up API for the prefix. The error
+        tells whether the API is in config but could not be set up (e.g. its
+        URL is unavailable) or the prefix is wrong.
+
+        prefix (str) — prefix to check.
+        '''
+
+        if self.is_prefix_defined(prefix):
+            return
+        config_prefixes = [*self.options.get('API', {}).keys(), self.options['prefix_to_ignore']]
+        set_up_prefixes = [*self.apis.keys(), self.options['prefix_to_ignore'].lower()]
+        if (prefix or '').lower() in (p.lower() for p in config_prefixes):
+            raise GenURLError(f'API for prefix "{prefix}" is not properly configured')
         else:
-            config_prefixes = [*self.options.get('API', {}).keys(), self.options['prefix_to_ignore']]
-            set_up_prefixes = [*self.apis.keys(), self.options['prefix_to_ignore'].lower()]
-            if ref.prefix in config_prefixes:
-                raise GenURLError(f'API for prefix "{ref.prefix}" is not properly configured')
-            else:
-                raise GenURLError(f'"{ref.prefix}" is a wrong prefix. Should be one of: '
-                                  f'{", ".join(set_up_prefixes)}.')
+            raise GenURLError(f'"{prefix}" is a wrong prefix. Should be one of: '
+                              f'{", ".join(set_up_prefixes)}.')
 
     def assume_api(self, ref: Reference) -> API:
         '''
@@ -284,6 +436,77 @@ class Preprocessor(BasePreprocessor):
         else:
             return self.find_api(ref)
 
+    def resolve_many(self, refs) -> list:
+        '''
+        Resolve many references at once, without processing Markdown.
+
+        References are deduplicated and grouped by prefix. The prefix of each
+        group is checked and its API is looked up only once, then every
+        reference of the group is looked for in the headers of this API.
+        References without prefix are looked for in all APIs online or go to
+        the default API offline. No warnings are shown and self.counter is
+        not changed.
+
+        Returns list of Resolution(url, error) in the order of refs. If the
+        reference could not be resolved, url is None and error is the message.
+
+        refs (iterable) — (prefix, verb, command) tuples, prefix may be empty
+                          or None.
+        '''
+
+        keys = []
+        groups = OrderedDict()
+        for prefix, verb, command in refs:
+            key = ((prefix or '').lower(), verb, command)
+            keys.append(key)
+            group = groups.setdefault(key[0], (prefix or '', OrderedDict()))
+            group[1][key] = None
+
+        resolved = {}
+        for prefix, group_keys in groups.values():
+            resolved.update(self._resolve_group(prefix, group_keys))
+        return [resolved[key] for key in keys]
+
+    def _resolve_group(self, prefix: str, keys) -> dict:
+        '''
+        Resolve references with the same prefix. The prefix is checked and
+        the API is determined once for the whole group. Returns dictionary
+        {key: Resolution}.
+
+        prefix (str) — prefix of all references in the group, as stated in
+                       the first of them;
+        keys (iterable) — (lowercase prefix, verb, command) tuples.
+        '''
+
+        group_api = None
+        try:
+            if prefix and prefix.lower() == self.options['prefix_to_ignore'].lower():
+                raise GenURLError(f'"{prefix}" is the prefix to ignore.')
+            if prefix:
+                self.check_prefix(prefix)
+                group_api = self.apis[prefix.lower()]
+            elif self.offline:
+                group_api = self.assume_api(Reference())
+        except GenURLError as e:
+            return {key: Resolution(None, str(e)) for key in keys}
+
+        result = {}
+        for key in keys:
+            ref = Reference(prefix=prefix, verb=key[1], command=key[2])
+            try:
+                if group_api is None:  # online and no prefix: look in every API
+                    api = self.find_api(ref)
+                else:
+                    api = group_api
+                    if not self.offline:
+                        self.check_reference(api, ref)
+            except GenURLError as e:
+                result[key] = Resolution(None, str(e))
+                continue
+            ref.endpoint_prefix = api.endpoint_prefix
+            result[key] = Resolution(api.gen_full_url(ref.__dict__), None)
+        return result
+
     def process_links(self, content: str) -> str:
         def _sub(block) -> str:
             '''
@@ -376,11 +599,16 @@ class Preprocessor(BasePreprocessor):
 
     def apply(self):
         self.logger.info('Applying preprocessor')
-        if not self.options['targets'] or\
-                self.context['target'] in self.options['targets']:
-            self._apply_for_all_files(self.process_links, 'Converting references')
-
-        if self.context['target'] in self.options['trim_if_targets']:
-            self._apply_for_all_files(self.trim_prefixes, 'Trimming prefixes')
+        try:
+            if not self.options['targets'] or\
+                    self.context['target'] in self.options['targets']:
+                self._apply_for_all_files(self.process_links, 'Converting references')
+
+            if self.context['target'] in self.options['trim_if_targets']:
+                self._apply_for_all_files(self.trim_prefixes, 'Trimming prefixes')
+        finally:
+            if self.options['shard_summary']:
+                self.write_summary(self._get_path(self.options['shard_summary']))
+            self._flush_warnings()
 
         self.logger.info(f'Preprocessor applied. {self.counter} links were added')
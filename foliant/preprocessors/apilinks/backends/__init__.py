@@ -0,0 +1,50 @@
+'''
+Registry of API site backends.
+
+Backend modules import heavy libraries (lxml, yaml) and are imported only
+when an API with such backend is set up in online mode.
+'''
+
+from collections import namedtuple
+from importlib import import_module
+
+from ..classes import API
+from ..classes import WrongModeError
+
+SiteBackend = namedtuple('SiteBackend',
+                         ['module', 'class_name', 'title', 'online_only', 'spec_required'])
+
+HTML_BACKEND = SiteBackend('.html', 'HTMLAPI', 'HTML', False, False)
+
+BACKENDS = {
+    'swagger': SiteBackend('.swagger', 'SwaggerAPI', 'Swagger UI', True, True),
+    'redoc': SiteBackend('.swagger', 'RedocAPI', 'Redoc', True, True),
+}
+
+
+def get_site_backend(name: str) -> SiteBackend:
+    '''
+    Return registry entry for site backend name. All backends which are not
+    registered (slate, aglio, mkdocs, ...) are parsed as HTML pages.
+    '''
+
+    return BACKENDS.get(name, HTML_BACKEND)
+
+
+def get_api_class(name: str, offline: bool) -> type:
+    '''
+    Return API class for site backend name, importing its module if needed.
+
+    In offline mode nothing is parsed, so the base API class is returned
+    without importing the backend module.
+
+    Throws WrongModeError if the backend only works in online mode.
+    '''
+
+    backend = get_site_backend(name)
+    if offline:
+        if backend.online_only:
+            raise WrongModeError(f'{backend.title} APIs only work in online mode')
+        return API
+    module = import_module(backend.module, __name__)
+    return getattr(module, backend.class_name)
@@ -0,0 +1,30 @@
+'''Site backend for static API websites like slate, aglio or mkdocs'''
+
+from io import BytesIO
+from lxml import etree
+
+from ..classes import API
+from ..tools import fetch
+
+
+class HTMLAPI(API):
+    '''API documentation website, whose headers are parsed from the HTML page'''
+
+    def _fill_headers(self) -> frozenset:
+        '''
+        Parse self.url and collect anchors of all headers. Header titles are
+        not stored because only anchors are looked up.
+
+        May throw HTTPError (403, 404, ...) or URLError if url is incorrect or
+        unavailable.
+        '''
+
+        page = fetch(self.url, self.login, self.password)  # may throw HTTPError, URLError
+        headers = set()
+        for event, elem in etree.iterparse(BytesIO(page), html=True):
+            if elem.tag in ('h1', 'h2', 'h3', 'h4'):
+                anchor = elem.attrib.get('id', None)
+                if anchor:
+                    headers.add(anchor)
+            elem.clear()
+        return frozenset(headers)
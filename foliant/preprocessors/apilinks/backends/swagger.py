@@ -0,0 +1,118 @@
+'''Swagger UI and Redoc site backends. Anchors are taken from the OpenAPI spec'''
+
+import yaml
+
+from pathlib import PosixPath
+from logging import getLogger
+
+from ..classes import API
+from ..classes import OperationIndex
+from ..classes import WrongModeError
+from ..constants import HTTP_VERBS
+from ..tools import ensure_root
+from ..tools import fetch
+
+logger = getLogger('flt.APILinks.backends.swagger')
+
+
+class SwaggerAPI(API):
+    ANCHOR_TEMPLATE = '/{tag}/{operation_id}'
+    HEADER_TEMPLATE = '{verb} {path}'
+    site_backend = 'swagger'
+    headers = frozenset()
+
+    def __init__(
+        self,
+        name: str,
+        url: str,
+        spec_url: str,
+        offline: bool,
+        endpoint_prefix: str = '',
+        login: str or None = None,
+        password: str or None = None,
+    ):
+        if offline:
+            raise WrongModeError('Refs to Swagger UI only work in online mode now')
+
+        self.header_template = self.HEADER_TEMPLATE
+
+        self.name = name
+        self.url = url
+
+        self.login = login
+        self.password = password
+
+        if not isinstance(spec_url, (str, PosixPath)):
+            raise TypeError('spec_url must be str or PosixPath!')
+        elif isinstance(spec_url, str) and spec_url.startswith('http'):
+            spec = fetch(spec_url, self.login, self.password)  # may throw HTTPError, URLError
+        else:  # supplied path, not a link
+            with open(spec_url, encoding='utf8') as f:
+                spec = f.read()
+        self.offline = offline
+        self.operations = self._fill_headers(yaml.load(spec, yaml.Loader))
+        # self.header_template = htempl
+        self.endpoint_prefix = ensure_root(endpoint_prefix) if endpoint_prefix else ''
+
+    @classmethod
+    def from_config(cls, name: str, config: dict, offline: bool):
+        return cls(
+            name,
+            config['url'],
+            config['spec'],
+            offline,
+            config.get('endpoint_prefix', ''),
+            config.get('login'),
+            config.get('password'),
+        )
+
+    def _fill_headers(self, spec: dict) -> OperationIndex:
+        '''
+        Parse the spec and generate the operation index {(verb, path): anchor}.
+        The parsed spec itself is not kept.
+        '''
+
+        operations = OperationIndex()
+        for path_, path_info in spec['paths'].items():
+            for verb, method_info in path_info.items():
+                if verb.upper() not in HTTP_VERBS:
+                    # print('skipping', verb)
+                    continue
+                tag = method_info['tags'][0]
+                # summary = method_info.get('summary', '')
+                operation_id = method_info['operationId']
+                anchor = self.ANCHOR_TEMPLATE.format(tag=tag,
+                                                     operation_id=operation_id)
+                operations.add(verb.upper(), path_, anchor)
+        return operations
+
+    def format_anchor(self, format_dict):
+        '''/store/placeOrder'''
+        logger.debug(
+            'Formatting header from:\n' +
+            '\n'.join(f'{k}: {v}' for k, v in format_dict.items())
+        )
+        full_command = format_dict['endpoint_prefix'].rstrip('/') + '/' + format_dict['command'].lstrip('/')
+        logger.debug(f'Scanning operations in {self.name} for {format_dict["verb"]} {full_command}')
+        result = self.operations.get(format_dict['verb'], full_command)
+        return result
+
+    def has_anchor(self, anchor: str or None) -> bool:
+        return anchor is not None
+
+    def to_dict(self) -> dict:
+        data = super().to_dict()
+        data['operations'] = self.operations.to_dict()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        api = super().from_dict(data)
+        api.operations = OperationIndex.from_dict(data['operations'])
+        return api
+
+
+class RedocAPI(SwaggerAPI):
+    ANCHOR_TEMPLATE = 'operation/{operation_id}'
+    site_backend = 'redoc'
+    # HEADER_TEMPLATE = '{summary}'
@@ -1,20 +1,19 @@
 '''Helper classes for apilinks preprocessor'''
 
-import yaml
-import ssl
+import sys
 
-from io import BytesIO
-from pathlib import PosixPath
+from collections import namedtuple
 from logging import getLogger
-from lxml import etree
-from urllib.request import urlopen
 
 from foliant.preprocessors.utils.header_anchors import to_id
-from .tools import ensure_root, urlopen_with_auth
-from .constants import HTTP_VERBS
+from .tools import ensure_root
+from .constants import DEFAULT_HEADER_TEMPLATE
 
 logger = getLogger('flt.APILinks.classes')
 
+Resolution = namedtuple('Resolution', ['url', 'error'])
+Resolution.__doc__ = '''Result of reference resolution: url or, if it failed, error message'''
+
 
 class Reference:
     '''
@@ -75,8 +74,66 @@ class Reference:
         )
 
 
+class OperationIndex:
+    '''
+    Compact mapping of API operations (verb + path) to their anchors.
+
+    Verbs and path segments are interned, so the same segment, used in many
+    paths, is stored (and pickled) only once.
+    '''
+
+    __slots__ = ('_operations',)
+
+    def __init__(self):
+        self._operations = {}
+
+    @staticmethod
+    def _split(path: str) -> tuple:
+        return tuple(sys.intern(segment) for segment in path.split('/'))
+
+    def add(self, verb: str, path: str, anchor: str):
+        '''Add operation with anchor into the index'''
+        paths = self._operations.setdefault(sys.intern(verb), {})
+        paths[self._split(path)] = anchor
+
+    def get(self, verb: str, path: str) -> str or None:
+        '''Return anchor of the operation or None if there's no such operation'''
+        paths = self._operations.get(verb)
+        if paths is None:
+            return None
+        return paths.get(tuple(path.split('/')))
+
+    def to_dict(self) -> dict:
+        '''Return JSON-serializable dictionary {verb: {path: anchor}}'''
+        return {verb: {'/'.join(segments): anchor for segments, anchor in paths.items()}
+                for verb, paths in self._operations.items()}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        '''Restore index from the dictionary, produced by to_dict method'''
+        index = cls()
+        for verb, paths in data.items():
+            for path, anchor in paths.items():
+                index.add(verb, path, anchor)
+        return index
+
+    def __getstate__(self):
+        return (self._operations,)
+
+    def __setstate__(self, state):
+        self._operations, = state
+
+    def __len__(self):
+        return sum(len(paths) for paths in self._operations.values())
+
+
 class API:
-    '''Helper class representing an API documentation website'''
+    '''
+    Helper class representing an API documentation website.
+
+    This base class is used as is in offline mode. Site backends, which
+    collect headers in online mode, are in the backends subpackage.
+    '''
 
     def __init__(self,
                  name: str,
@@ -97,29 +154,37 @@ class API:
         self.site_backend = site_backend
         self.endpoint_prefix = ensure_root(endpoint_prefix) if endpoint_prefix else ''
 
-    def _fill_headers(self) -> dict:
+    @classmethod
+    def from_config(cls, name: str, config: dict, offline: bool):
         '''
-        Parse self.url and generate headers dictionary {'anchor': header_title}.
-        If self.offline == true — returns an empty dictionary.
+        Create API object from the API subsection of the preprocessor config.
+
+        name (str) — API name from the config;
+        config (dict) — API properties from the config;
+        offline (bool) — whether the preprocessor works in offline mode.
+        '''
+
+        return cls(
+            name,
+            config['url'],
+            config.get('header_template', DEFAULT_HEADER_TEMPLATE),
+            offline,
+            config.get('site_backend', 'slate'),
+            config.get('endpoint_prefix', ''),
+            config.get('login'),
+            config.get('password'),
+        )
 
-        May throw HTTPError (403, 404, ...) or URLError if url is incorrect or
-        unavailable.
+    def _fill_headers(self) -> frozenset:
+        '''
+        Return an empty set in offline mode. In online mode the web-page is
+        parsed by the HTML site backend, which is imported only here.
         '''
 
         if self.offline:
-            return {}
-        context = ssl._create_unverified_context()
-        if self.login and self.password:
-            page = urlopen_with_auth(self.url, self.login, self.password, context)
-        else:
-            page = urlopen(self.url, context=context).read()  # may throw HTTPError, URLError
-        headers = {}
-        for event, elem in etree.iterparse(BytesIO(page), html=True):
-            if elem.tag in ('h1', 'h2', 'h3', 'h4'):
-                anchor = elem.attrib.get('id', None)
-                if anchor:
-                    headers[anchor] = elem.text
-        return headers
+            return frozenset()
+        from .backends.html import HTMLAPI
+        return HTMLAPI._fill_headers(self)
 
     def format_header(self, format_dict: dict) -> str:
         '''
@@ -155,6 +220,10 @@ class API:
         '''
         return f'{self.url}#{self.format_anchor(format_dict)}'
 
+    def has_anchor(self, anchor: str or None) -> bool:
+        '''Return True if there's a header with such anchor on the API web-page'''
+        return anchor in self.headers
+
     def find_reference(self, ref: Reference) -> bool:
         '''
         Look for method by its reference and, if found, return True.
@@ -165,7 +234,7 @@ class API:
         apiref.endpoint_prefix = self.endpoint_prefix
         anchor = self.format_anchor(apiref.__dict__)
         logger.debug(f'Looking for reference in {self.name} by anchor: "{anchor}"')
-        result = anchor in self.headers
+        result = self.has_anchor(anchor)
         if result:
             logger.debug(f'Reference found in {self.name}')
             return result
@@ -173,99 +242,46 @@ class API:
             apiref.endpoint_prefix = ''
             anchor = self.format_anchor(apiref.__dict__)
             logger.debug(f'Looking for reference in {self.name} by anchor: "{anchor}"')
-            result = anchor in self.headers
+            result = self.has_anchor(anchor)
             if result:
                 logger.debug(f'Reference found in {self.name}')
             return result
 
-    def __str__(self):
-        return f'<API: {self.name}>'
-
-
-class SwaggerAPI(API):
-    ANCHOR_TEMPLATE = '/{tag}/{operation_id}'
-    HEADER_TEMPLATE = '{verb} {path}'
-
-    def __init__(
-        self,
-        name: str,
-        url: str,
-        spec_url: str,
-        offline: bool,
-        endpoint_prefix: str = '',
-        login: str or None = None,
-        password: str or None = None,
-    ):
-        if offline:
-            raise WrongModeError('Refs to Swagger UI only work in online mode now')
-
-        self.header_template = self.HEADER_TEMPLATE
-
-        self.name = name
-        self.url = url
-
-        self.login = login
-        self.password = password
-
-        if not isinstance(spec_url, (str, PosixPath)):
-            raise TypeError('spec_url must be str or PosixPath!')
-        elif isinstance(spec_url, str) and spec_url.startswith('http'):
-            context = ssl._create_unverified_context()
-            if self.login and self.password:
-                spec = urlopen_with_auth(spec_url, self.login, self.password, context)
-            else:
-                spec = urlopen(spec_url, context=context).read()  # may throw HTTPError, URLError
-        else:  # supplied path, not a link
-            with open(spec_url, encoding='utf8') as f:
-                spec = f.read()
-        self.spec = yaml.load(spec, yaml.Loader)
-
-        self.offline = offline
-        self._fill_headers()
-        # self.header_template = htempl
-        self.endpoint_prefix = ensure_root(endpoint_prefix) if endpoint_prefix else ''
-
-    def _fill_headers(self) -> dict:
+    def to_dict(self) -> dict:
         '''
-        Parse self.swagger_url and generate headers dictionary {'anchor': header_title}.
-
-        May throw HTTPError (403, 404, ...) or URLError if url is incorrect or
-        unavailable.
+        Return a JSON-serializable dictionary with everything needed to
+        restore this API object without fetching the API web-page again.
         '''
 
-        self.headers = {}
-        self.anchors = {}
-        for path_, path_info in self.spec['paths'].items():
-            for verb, method_info in path_info.items():
-                if verb.upper() not in HTTP_VERBS:
-                    # print('skipping', verb)
-                    continue
-                tag = method_info['tags'][0]
-                # summary = method_info.get('summary', '')
-                operation_id = method_info['operationId']
-                anchor = self.ANCHOR_TEMPLATE.format(tag=tag,
-                                                     operation_id=operation_id)
-                header = self.HEADER_TEMPLATE.format(verb=verb.upper(),
-                                                     path=path_)
-                self.headers[anchor] = header
-                self.anchors[header] = anchor
+        return {'name': self.name,
+                'url': self.url,
+                'offline': self.offline,
+                'site_backend': self.site_backend,
+                'header_template': self.header_template,
+                'endpoint_prefix': self.endpoint_prefix,
+                'headers': sorted(self.headers)}
 
-    def format_anchor(self, format_dict):
-        '''/store/placeOrder'''
-        logger.debug(
-            'Formatting header from:\n' +
-            '\n'.join(f'{k}: {v}' for k, v in format_dict.items())
-        )
-        full_command = format_dict['endpoint_prefix'].rstrip('/') + '/' + format_dict['command'].lstrip('/')
-        header = self.HEADER_TEMPLATE.format(verb=format_dict['verb'], path=full_command)
-        logger.debug(f'Scanning headers in {self.name} for {header}')
-        result = self.anchors.get(header)
-        return result
+    @classmethod
+    def from_dict(cls, data: dict):
+        '''
+        Restore API object from the dictionary, produced by to_dict method.
+        Nothing is fetched from the web.
+        '''
 
+        api = cls.__new__(cls)
+        api.name = data['name']
+        api.url = data['url']
+        api.offline = data['offline']
+        api.login = None
+        api.password = None
+        api.site_backend = data['site_backend']
+        api.header_template = data['header_template']
+        api.endpoint_prefix = data['endpoint_prefix']
+        api.headers = frozenset(data['headers'])
+        return api
 
-class RedocAPI(SwaggerAPI):
-    ANCHOR_TEMPLATE = 'operation/{operation_id}'
-    # HEADER_TEMPLATE = '{summary}'
+    def __str__(self):
+        return f'<API: {self.name}>'
 
 
 class GenURLError(Exception):
@@ -276,3 +292,15 @@ class GenURLError(Exception):
 class WrongModeError(Exception):
     '''Exception in the full url generation process'''
     pass
+
+
+def __getattr__(name):
+    '''
+    SwaggerAPI and RedocAPI were moved into backends.swagger. Keep them
+    importable from here without importing yaml on module load.
+    '''
+
+    if name in ('SwaggerAPI', 'RedocAPI'):
+        from .backends import swagger
+        return getattr(swagger, name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -1,6 +1,7 @@
 import base64
+import hashlib
 
-from urllib.request import Request, urlopen
+from pathlib import PurePath
 
 
 def ensure_root(route):
@@ -33,8 +34,91 @@ def convert_to_anchor(reference: str) -> str:
 
 
 def urlopen_with_auth(dest: str, login: str, password: str, context=None):
+    from urllib.request import Request, urlopen
+
     request = Request(dest)
     b64_creds = base64.b64encode(bytes(f'{login}:{password}', 'ascii')).decode('utf-8')
     request.add_header('Authorization', f'Basic {b64_creds}')
     result = urlopen(request, context=context)
     return result.read()
+
+
+def fetch(url: str, login: str or None = None, password: str or None = None) -> bytes:
+    '''
+    Download the content of url, using basic authentication if login and
+    password are stated. SSL certificates are not verified.
+
+    ssl and urllib.request are imported here and not at module level, because
+    they are only needed in online mode.
+
+    May throw HTTPError (403, 404, ...) or URLError if url is incorrect or
+    unavailable.
+    '''
+
+    import ssl
+    from urllib.request import urlopen
+
+    context = ssl._create_unverified_context()
+    if login and password:
+        return urlopen_with_auth(url, login, password, context)
+    return urlopen(url, context=context).read()
+
+
+def get_shard(rel_path, shard_count: int) -> int:
+    '''
+    Return the number of the shard which file with relative path rel_path
+    belongs to.
+
+    The hash is calculated from the POSIX form of the path so the result is
+    the same on every machine and on every run, unlike the builtin hash().
+
+    >>> get_shard('index.md', 1)
+    0
+    '''
+
+    key = PurePath(rel_path).as_posix().encode('utf8')
+    digest = hashlib.md5(key).digest()
+    return int.from_bytes(digest[:8], 'big') % shard_count
+
+
+def merge_summaries(summaries: list) -> dict:
+    '''
+    Merge summaries of several shards, produced by the preprocessor with
+    shard_summary option, into one summary.
+
+    If some shards are missing, 'incomplete' is True in the result.
+    Warnings which are not related to a file (e.g. config errors) are issued
+    by every shard, so they are counted once.
+
+    Throws ValueError if summaries have different shard_count or the same
+    shard is given twice.
+
+    summaries (list) — list of summary dictionaries.
+    '''
+
+    shard_counts = {summary.get('shard_count', 1) for summary in summaries}
+    if len(shard_counts) > 1:
+        raise ValueError(f'Summaries have different shard_count: '
+                         f'{", ".join(map(str, sorted(shard_counts)))}')
+    shard_count = shard_counts.pop() if shard_counts else 1
+
+    result = {'shards': [], 'shard_count': shard_count, 'counter': 0, 'warnings': []}
+    warnings = {}
+    for summary in summaries:
+        shard_index = summary.get('shard_index', 0)
+        if shard_index in result['shards']:
+            raise ValueError(f'Shard {shard_index} is given twice')
+        result['shards'].append(shard_index)
+        result['counter'] += summary.get('counter', 0)
+        for warning in summary.get('warnings', []):
+            key = (warning['message'], warning['file'])
+            count = warning.get('count', 1)
+            if warning['file']:
+                warnings[key] = warnings.get(key, 0) + count
+            else:
+                warnings[key] = max(warnings.get(key, 0), count)
+    result['shards'].sort()
+    result['incomplete'] = result['shards'] != list(range(shard_count))
+    result['warnings'] = [{'message': msg, 'file': filename, 'count': count}
+                          for (msg, filename), count in warnings.items()]
+    return result
@@ -16,11 +16,11 @@ setup(
     description=SHORT_DESCRIPTION,
     long_description=LONG_DESCRIPTION,
     long_description_content_type='text/markdown',
-    version='1.2.6',
+    version='1.2.7',
     author='Daniil Minukhin',
     author_email='ddddsa@gmail.com',
     url='https://github.com/foliant-docs/foliantcontrib.apilinks',
-    packages=['foliant.preprocessors.apilinks'],
+    packages=['foliant.preprocessors.apilinks', 'foliant.preprocessors.apilinks.backends'],
     license='MIT',
     platforms='any',
     install_requires=[